@@ -3,60 +3,196 @@ Flask API for EduTech Personalized Study Plan Generator
 Provides endpoints for task management and study plan generation
 """
 
-from flask import Flask, jsonify, request
+import hashlib
+import time
+import uuid
+from functools import lru_cache, wraps
+
+import msgspec
+import numpy as np
+import orjson
+from flask import Flask, Response, jsonify, request
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
-from pydantic import BaseModel, Field, ValidationError
-from typing import Optional
+from typing import Annotated, Literal, Optional, Union, get_args
 from datetime import datetime, timezone
-from enum import Enum
 
 from .data import (
     process_task as pt,
+    process_tasks_bulk,
     read_tasks as rt,
+    read_tasks_json,
     update_task_status,
     delete_task,
-    store_score as st,
+    store_scores_bulk,
     get_tasks_by_status,
-    get_overdue_tasks
-)
-from .planner import (
-    DIFFICULTY_WEIGHT,
-    PRIORITY_WEIGHT,
-    time_weight,
-    calculate_task_score,
-    generate_study_plan,
-    adjust_plan_for_missed_task,
-    get_upcoming_tasks
+    get_overdue_tasks,
+    get_upcoming_tasks_db,
+    get_stats,
+    get_tasks_version
 )
+from .planner import calculate_task_scores, generate_study_plan
+
+
+# Validated as a plain string membership check; no Enum instance is created per request
+Priority = Literal["Pending", "Ongoing", "Completed"]
+PRIORITY_VALUES = frozenset(get_args(Priority))
+
 
+# Raw date input: an ISO-8601 string or a Unix timestamp
+DateInput = Union[str, int, float]
 
-class Priority(str, Enum):
-    ONGOING = "Ongoing"
-    COMPLETED = "Completed"
-    PENDING = "Pending"
+
+def _to_datetime(value: DateInput) -> datetime:
+    """
+    Convert a raw date input into a datetime.
+    
+    Strings may be any form datetime.fromisoformat accepts, including dates
+    without seconds ("2026-01-15T10:00"), plain dates and a trailing 'Z'.
+    
+    Raises:
+        ValueError: If the value is not a valid date
+    """
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    try:
+        return datetime.fromtimestamp(value, timezone.utc)
+    except (OverflowError, OSError) as e:
+        raise ValueError(f"Invalid timestamp: {value}") from e
 
 
-class TaskRequest(BaseModel):
+class TaskRequest(msgspec.Struct):
     task_name: str
-    scale_difficulty: int = Field(..., ge=1, le=5)  # Scale from 1 to 5
+    scale_difficulty: Annotated[int, msgspec.Meta(ge=1, le=5)]  # Scale from 1 to 5
     priority: Priority
-    createdAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    timedue: Optional[datetime] = Field(default=None)
+    # Dates are converted in __post_init__ rather than by msgspec, whose datetime
+    # decoding only accepts full RFC 3339 timestamps. The annotations describe the
+    # raw input; once decoded, createdAt is always a datetime and timedue is a
+    # datetime or None.
+    createdAt: Union[DateInput, msgspec.UnsetType] = msgspec.UNSET
+    timedue: Optional[DateInput] = None
+    
+    def __post_init__(self) -> None:
+        if self.createdAt is msgspec.UNSET:
+            self.createdAt = datetime.now(timezone.utc)
+        else:
+            self.createdAt = _to_datetime(self.createdAt)
+        if self.timedue is not None:
+            self.timedue = _to_datetime(self.timedue)
 
 
-class TaskStatusUpdate(BaseModel):
+class TaskStatusUpdate(msgspec.Struct):
     task_name: str
     new_status: Priority
 
 
-class StudyPlanRequest(BaseModel):
-    available_hours_per_day: float = Field(default=4.0, ge=0.5, le=24.0)
-    study_session_duration: float = Field(default=1.0, ge=0.25, le=8.0)
+class StudyPlanRequest(msgspec.Struct):
+    available_hours_per_day: Annotated[float, msgspec.Meta(ge=0.5, le=24.0)] = 4.0
+    study_session_duration: Annotated[float, msgspec.Meta(ge=0.25, le=8.0)] = 1.0
+    
+    def __post_init__(self) -> None:
+        # The planner lays out whole sessions, so a day must fit at least one
+        if int(self.available_hours_per_day / self.study_session_duration) < 1:
+            raise ValueError("available_hours_per_day must fit at least one study session")
+
+
+# Decoders are built once so each request is parsed and validated in a single pass.
+# strict=False keeps the lax coercion clients relied on (e.g. "4" for an int);
+# dates get the same leniency from TaskRequest.__post_init__.
+_POST_TASK_DECODER = msgspec.json.Decoder(TaskRequest, strict=False)
+_POST_TASKS_DECODER = msgspec.json.Decoder(list[TaskRequest], strict=False)
+_UPDATE_DECODER = msgspec.json.Decoder(TaskStatusUpdate, strict=False)
+# A null plan body means "use the defaults", as an empty one does
+_PLAN_DECODER = msgspec.json.Decoder(Optional[StudyPlanRequest], strict=False)
+
+
+# Cached plans are keyed on the tasks version and a time bucket, so they are rebuilt
+# after any task change and at least this often as due dates draw nearer
+PLAN_CACHE_SECONDS = 60
+
+
+@lru_cache(maxsize=32)
+def _cached_study_plan(
+    tasks_version: int,
+    available_hours_per_day: float,
+    study_session_duration: float,
+    time_bucket: int
+) -> dict:
+    """Generate a study plan; memoized on the tasks version and request parameters."""
+    return generate_study_plan(
+        rt(),
+        available_hours_per_day=available_hours_per_day,
+        study_session_duration=study_session_duration
+    )
+
+
+def get_study_plan(
+    available_hours_per_day: float = 4.0,
+    study_session_duration: float = 1.0
+) -> dict:
+    """
+    Return the study plan for the current tasks, reusing a cached one when possible.
+    
+    The returned plan is shared between requests and must not be modified.
+    """
+    return _cached_study_plan(
+        get_tasks_version(),
+        available_hours_per_day,
+        study_session_duration,
+        int(time.time() // PLAN_CACHE_SECONDS)
+    )
+
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson, used by jsonify and dict responses."""
+
+    option = orjson.OPT_NAIVE_UTC
+
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, option=self.option), mimetype="application/json"
+        )
 
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
 
+# The tasks version restarts at zero with the process, so ETags also carry a per-run token
+_ETAG_PREFIX = uuid.uuid4().hex[:8]
+
+
+def etag_by_version(view):
+    """
+    Tag a view's responses with the tasks version and honour If-None-Match.
+    
+    Only for views whose output depends on nothing but the stored tasks and
+    the request URL: a client presenting the current tag gets an empty 304
+    without the view running at all. Tags include a digest of the URL, so a
+    tag only matches the resource that issued it.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        url_digest = hashlib.blake2s(request.full_path.encode(), digest_size=8).hexdigest()
+        etag = f"{_ETAG_PREFIX}-{get_tasks_version()}-{url_digest}"
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+        
+        response = app.make_response(view(*args, **kwargs))
+        if response.status_code == 200:
+            response.set_etag(etag)
+        return response
+    return wrapper
+
 
 @app.route("/health", methods=["GET"])
 def health_check() -> dict:
@@ -78,22 +214,46 @@ def post_task() -> dict:
     }
     """
     try:
-        data = request.get_json()
-        task = TaskRequest(**data)
-        result = pt(task.model_dump())
+        task = _POST_TASK_DECODER.decode(request.get_data())
+        result = pt(task)
         return jsonify(result), 201
-    except ValidationError as e:
+    except msgspec.DecodeError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@app.route("/post_tasks", methods=["POST"])
+def post_tasks() -> dict:
+    """
+    Create several tasks at once.
+    
+    Expected JSON body:
+    [
+        {"task_name": "Study Calculus", "scale_difficulty": 4, "priority": "Pending"},
+        {"task_name": "Read Physics", "scale_difficulty": 2, "priority": "Ongoing"}
+    ]
+    """
+    try:
+        tasks = _POST_TASKS_DECODER.decode(request.get_data())
+        result = process_tasks_bulk(tasks)
+        
+        if result.get("status") == "error":
+            return jsonify(result), 409
+        
+        return jsonify(result), 201
+    except msgspec.DecodeError as e:
         return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
 @app.route("/get_tasks", methods=["GET"])
+@etag_by_version
 def get_tasks() -> list:
     """Get all tasks."""
     try:
-        tasks = rt()
-        return jsonify(tasks), 200
+        return Response(read_tasks_json(), mimetype="application/json"), 200
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -110,15 +270,14 @@ def update_task() -> dict:
     }
     """
     try:
-        data = request.get_json()
-        update_req = TaskStatusUpdate(**data)
+        update_req = _UPDATE_DECODER.decode(request.get_data())
         result = update_task_status(update_req.task_name, update_req.new_status)
         
         if result.get("status") == "error":
             return jsonify(result), 404
         
         return jsonify(result), 200
-    except ValidationError as e:
+    except msgspec.DecodeError as e:
         return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -146,11 +305,16 @@ def score_tasks() -> dict:
     """
     try:
         tasks = rt()
+        task_scores = calculate_task_scores(tasks)
+        calculated_at = datetime.now(timezone.utc).isoformat()
         scores = []
+        stored_scores = []
         
-        for task in tasks:
+        # Highest score first; stable so ties keep their stored order
+        for i in np.argsort(-task_scores, kind="stable").tolist():
+            task = tasks[i]
             task_name = task.get("task_name")
-            score = calculate_task_score(task)
+            score = float(task_scores[i])
             scores.append({
                 "task_name": task_name,
                 "score": round(score, 2),
@@ -159,11 +323,10 @@ def score_tasks() -> dict:
                 "timedue": task.get("timedue")
             })
             
-            # Store the score
-            st(task_name, score)
+            stored_scores.append((task_name, score, calculated_at))
         
-        # Sort by score descending
-        scores.sort(key=lambda x: x["score"], reverse=True)
+        # Store all scores in one transaction
+        store_scores_bulk(stored_scores)
         
         return jsonify({"scores": scores}), 200
     except Exception as e:
@@ -182,18 +345,17 @@ def generate_plan() -> dict:
     }
     """
     try:
-        data = request.get_json() or {}
-        plan_request = StudyPlanRequest(**data)
+        plan_request = _PLAN_DECODER.decode(request.get_data() or b"null")
+        if plan_request is None:
+            plan_request = StudyPlanRequest()
         
-        tasks = rt()
-        plan = generate_study_plan(
-            tasks,
+        plan = get_study_plan(
             available_hours_per_day=plan_request.available_hours_per_day,
             study_session_duration=plan_request.study_session_duration
         )
         
         return jsonify(plan), 200
-    except ValidationError as e:
+    except msgspec.DecodeError as e:
         return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -211,15 +373,18 @@ def mark_missed(task_name: str) -> dict:
         if update_result.get("status") == "error":
             return jsonify(update_result), 404
         
-        # Generate new plan with adjusted priorities
-        tasks = rt()
-        plan = generate_study_plan(tasks)
+        # Copy the shared cached plan, duplicating only the entries that get modified
+        cached_plan = get_study_plan()
+        plan = dict(cached_plan)
+        plan["schedule"] = []
         
         # Find and boost the missed task in the plan
-        for scheduled_task in plan.get("schedule", []):
+        for scheduled_task in cached_plan.get("schedule", []):
             if scheduled_task["task_name"] == task_name:
+                scheduled_task = dict(scheduled_task)
                 scheduled_task["priority_score"] *= 1.5
                 scheduled_task["note"] = "Priority increased due to missed session"
+            plan["schedule"].append(scheduled_task)
         
         # Re-sort by priority
         plan["schedule"].sort(key=lambda x: x["priority_score"], reverse=True)
@@ -244,8 +409,7 @@ def upcoming_tasks() -> dict:
     """
     try:
         days_ahead = request.args.get("days_ahead", default=7, type=int)
-        tasks = rt()
-        upcoming = get_upcoming_tasks(tasks, days_ahead)
+        upcoming = get_upcoming_tasks_db(days_ahead)
         
         return jsonify({
             "days_ahead": days_ahead,
@@ -270,10 +434,11 @@ def overdue_tasks() -> dict:
 
 
 @app.route("/tasks_by_status/<status>", methods=["GET"])
+@etag_by_version
 def tasks_by_status(status: str) -> dict:
     """Get all tasks with a specific status (Pending, Ongoing, Completed)."""
     try:
-        if status not in ["Pending", "Ongoing", "Completed"]:
+        if status not in PRIORITY_VALUES:
             return jsonify({
                 "status": "error",
                 "message": "Invalid status. Must be one of: Pending, Ongoing, Completed"
@@ -293,27 +458,7 @@ def tasks_by_status(status: str) -> dict:
 def stats() -> dict:
     """Get overall statistics about tasks and study progress."""
     try:
-        tasks = rt()
-        
-        total_tasks = len(tasks)
-        pending_tasks = len([t for t in tasks if t.get("priority") == "Pending"])
-        ongoing_tasks = len([t for t in tasks if t.get("priority") == "Ongoing"])
-        completed_tasks = len([t for t in tasks if t.get("priority") == "Completed"])
-        overdue = get_overdue_tasks()
-        
-        # Calculate average difficulty
-        difficulties = [int(t.get("scale_difficulty", 1)) for t in tasks]
-        avg_difficulty = sum(difficulties) / len(difficulties) if difficulties else 0
-        
-        return jsonify({
-            "total_tasks": total_tasks,
-            "pending": pending_tasks,
-            "ongoing": ongoing_tasks,
-            "completed": completed_tasks,
-            "overdue": len(overdue),
-            "completion_rate": round(completed_tasks / total_tasks * 100, 1) if total_tasks > 0 else 0,
-            "average_difficulty": round(avg_difficulty, 1)
-        }), 200
+        return jsonify(get_stats()), 200
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -4,9 +4,12 @@ Data Layer - SQLite-based storage for tasks and study plans
 
 import sqlite3
 import threading
-from typing import List, Dict, Any, Optional
+import time
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 
+import orjson
+
 # Use relative paths from the project root
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 DB_DIR = BASE_DIR / "db"
@@ -14,32 +17,55 @@ DB_FILE = DB_DIR / "studyplan.db"
 # Track initialization for thread-safe setup
 _db_initialized = False
 _init_lock = threading.Lock()
+# Each thread keeps one open connection; the generation changes when the database is recreated
+_db_generation = 0
+_local = threading.local()
+# Bumped after every write to the tasks table; cached reads are keyed on it
+_version = 0
+_tasks_cache: Optional[Tuple[int, List[Dict[str, Any]]]] = None
+_tasks_json_cache: Optional[Tuple[int, bytes]] = None
+_cache_lock = threading.Lock()
 
 # Column headers for consistent responses
 TASK_HEADERS = ["task_name", "scale_difficulty", "priority", "createdAt", "timedue"]
 SCORE_HEADERS = ["task_name", "score", "calculated_at"]
+# Unix timestamp of timedue, computed by SQLite so date filters are integer range scans.
+# Offsets and 'Z' are honoured, naive values are treated as UTC, unparsable values give NULL.
+_DUE_EPOCH_EXPR = "CAST(strftime('%s', timedue) AS INTEGER)"
 
 
 def initialize_db():
     """Initialize SQLite database and tables if they don't exist."""
-    global _db_initialized
+    global _db_initialized, _db_generation
     with _init_lock:
         if _db_initialized and DB_FILE.exists():
             return
 
         DB_DIR.mkdir(exist_ok=True)
         with sqlite3.connect(DB_FILE) as conn:
+            # WAL lets readers proceed while a write is in progress; the mode persists in the file
+            conn.execute("PRAGMA journal_mode=WAL")
             conn.execute(
-                """
+                f"""
                 CREATE TABLE IF NOT EXISTS tasks (
                     task_name TEXT PRIMARY KEY,
                     scale_difficulty TEXT,
                     priority TEXT,
                     createdAt TEXT,
-                    timedue TEXT
+                    timedue TEXT,
+                    due_epoch INTEGER GENERATED ALWAYS AS ({_DUE_EPOCH_EXPR}) VIRTUAL
                 )
                 """
             )
+            # Databases created before due_epoch existed get the column added in place
+            columns = {row[1] for row in conn.execute("PRAGMA table_xinfo(tasks)")}
+            if "due_epoch" not in columns:
+                conn.execute(
+                    "ALTER TABLE tasks ADD COLUMN due_epoch INTEGER "
+                    f"GENERATED ALWAYS AS ({_DUE_EPOCH_EXPR}) VIRTUAL"
+                )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_priority ON tasks(priority)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_due_epoch ON tasks(due_epoch)")
             conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS scores (
@@ -52,18 +78,56 @@ def initialize_db():
                 """
             )
         _db_initialized = True
+        _db_generation += 1
+    # A freshly created database must not be served from an older cache
+    _bump_version()
 
 
 def _get_connection() -> sqlite3.Connection:
-    """Return a SQLite connection with row factory configured."""
+    """
+    Return this thread's SQLite connection, opening it on first use.
+    
+    Use the connection as a context manager around writes so they are
+    committed (or rolled back) on exit; plain reads need no transaction.
+    """
     if not _db_initialized or not DB_FILE.exists():
         initialize_db()
-    conn = sqlite3.connect(DB_FILE)
-    conn.execute("PRAGMA foreign_keys = ON")
-    conn.row_factory = sqlite3.Row
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.generation != _db_generation:
+        if conn is not None:
+            conn.close()
+        conn = sqlite3.connect(DB_FILE)
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("PRAGMA mmap_size = 268435456")
+        _local.conn = conn
+        _local.generation = _db_generation
     return conn
 
 
+def _rows_to_tasks(rows) -> List[Dict[str, Any]]:
+    """Build task dictionaries from plain row tuples selected in TASK_HEADERS order."""
+    return [dict(zip(TASK_HEADERS, row)) for row in rows]
+
+
+def _bump_version() -> None:
+    """Invalidate cached task reads after a write."""
+    global _version
+    with _cache_lock:
+        _version += 1
+
+
+def get_tasks_version() -> int:
+    """
+    Return the current version of the tasks table.
+    
+    The version changes whenever tasks are added, updated or deleted by this
+    process, so it can be used as a cache key for anything derived from tasks.
+    """
+    return _version
+
+
 def _isoformat(value: Any) -> Optional[str]:
     """Convert datetime-like objects to ISO strings."""
     if value is None:
@@ -81,50 +145,136 @@ def _normalize_value(value: Any) -> Any:
     return getattr(value, "value", value)
 
 
-def process_task(data: dict) -> dict:
+def _task_row(data: Any) -> tuple:
+    """
+    Convert task data into a row tuple matching TASK_HEADERS.
+    
+    Accepts either a dictionary or an object exposing the task fields as
+    attributes (such as a validated request struct), so callers don't need
+    to build an intermediate dict.
+    """
+    if isinstance(data, dict):
+        task_name, scale_difficulty, priority, created_at, timedue = (
+            data.get(header) for header in TASK_HEADERS
+        )
+    else:
+        task_name, scale_difficulty, priority, created_at, timedue = (
+            getattr(data, header, None) for header in TASK_HEADERS
+        )
+    return (
+        task_name,
+        str(_normalize_value(scale_difficulty)),
+        priority,
+        _isoformat(created_at),
+        _isoformat(timedue),
+    )
+
+
+_INSERT_TASK_SQL = """
+    INSERT INTO tasks (task_name, scale_difficulty, priority, createdAt, timedue)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+
+def process_task(data: Any) -> dict:
     """
     Add a new task to the database.
     
     Args:
-        data: Dictionary containing task information
+        data: Dictionary or object containing task information
         
     Returns:
         Status dictionary
     """
+    row = _task_row(data)
     try:
         with _get_connection() as conn:
-            conn.execute(
-                """
-                INSERT INTO tasks (task_name, scale_difficulty, priority, createdAt, timedue)
-                VALUES (?, ?, ?, ?, ?)
-                """,
-                (
-                    data.get("task_name"),
-                    str(_normalize_value(data.get("scale_difficulty"))),
-                    str(_normalize_value(data.get("priority"))),
-                    _isoformat(data.get("createdAt")),
-                    _isoformat(data.get("timedue")),
-                ),
-            )
+            conn.execute(_INSERT_TASK_SQL, row)
     except sqlite3.IntegrityError:
         return {"status": "error", "message": "Task already exists"}
+    _bump_version()
 
-    return {"status": "saved", "task_name": data.get("task_name")}
+    return {"status": "saved", "task_name": row[0]}
+
+
+def process_tasks_bulk(rows: List[Any]) -> dict:
+    """
+    Add several tasks to the database in a single transaction.
+    
+    Either every task is saved or, if any of them already exists, none are.
+    
+    Args:
+        rows: List of dictionaries or objects containing task information
+        
+    Returns:
+        Status dictionary
+    """
+    task_rows = [_task_row(data) for data in rows]
+    try:
+        with _get_connection() as conn:
+            conn.executemany(_INSERT_TASK_SQL, task_rows)
+    except sqlite3.IntegrityError:
+        return {"status": "error", "message": "One or more tasks already exist"}
+    _bump_version()
+
+    return {
+        "status": "saved",
+        "count": len(task_rows),
+        "task_names": [row[0] for row in task_rows],
+    }
 
 
 def read_tasks() -> List[Dict[str, Any]]:
     """
     Read all tasks from the database.
     
+    Results are cached until the next write, so the returned list is shared
+    between callers and must not be modified.
+    
     Returns:
         List of task dictionaries
     """
-    with _get_connection() as conn:
-        cursor = conn.execute(
-            "SELECT task_name, scale_difficulty, priority, createdAt, timedue FROM tasks"
-        )
-        rows = cursor.fetchall()
-    return [dict(row) for row in rows]
+    global _tasks_cache
+    with _cache_lock:
+        version = _version
+        cached = _tasks_cache
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    conn = _get_connection()
+    cursor = conn.execute(
+        "SELECT task_name, scale_difficulty, priority, createdAt, timedue FROM tasks"
+    )
+    tasks = _rows_to_tasks(cursor)
+
+    with _cache_lock:
+        if _tasks_cache is None or _tasks_cache[0] <= version:
+            _tasks_cache = (version, tasks)
+    return tasks
+
+
+def read_tasks_json() -> bytes:
+    """
+    Read all tasks from the database already encoded as a JSON array.
+    
+    The encoded bytes are cached alongside read_tasks() until the next write.
+    
+    Returns:
+        UTF-8 encoded JSON array of task objects
+    """
+    global _tasks_json_cache
+    with _cache_lock:
+        version = _version
+        cached = _tasks_json_cache
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    encoded = orjson.dumps(read_tasks())
+
+    with _cache_lock:
+        if _tasks_json_cache is None or _tasks_json_cache[0] <= version:
+            _tasks_json_cache = (version, encoded)
+    return encoded
 
 
 def update_task_status(task_name: str, new_status: str) -> dict:
@@ -138,7 +288,10 @@ def update_task_status(task_name: str, new_status: str) -> dict:
     Returns:
         Status dictionary
     """
-    normalized_status = str(_normalize_value(new_status))
+    if isinstance(new_status, str):
+        normalized_status = new_status
+    else:
+        normalized_status = str(_normalize_value(new_status))
     with _get_connection() as conn:
         cursor = conn.execute(
             "UPDATE tasks SET priority = ? WHERE task_name = ?",
@@ -146,6 +299,7 @@ def update_task_status(task_name: str, new_status: str) -> dict:
         )
         if cursor.rowcount == 0:
             return {"status": "error", "message": "Task not found"}
+    _bump_version()
     return {"status": "updated", "task_name": task_name, "new_status": normalized_status}
 
 
@@ -163,6 +317,7 @@ def delete_task(task_name: str) -> dict:
         cursor = conn.execute("DELETE FROM tasks WHERE task_name = ?", (task_name,))
         if cursor.rowcount == 0:
             return {"status": "error", "message": "Task not found"}
+    _bump_version()
     return {"status": "deleted", "task_name": task_name}
 
 
@@ -200,6 +355,34 @@ def store_score(task_name: str, score: float, calculated_at: Optional[str] = Non
     return {"status": "score saved", "task_name": task_name, "score": score}
 
 
+def store_scores_bulk(scores: List[Tuple[str, float, str]]) -> dict:
+    """
+    Store many calculated priority scores in a single transaction.
+    
+    Args:
+        scores: List of (task_name, score, calculated_at) tuples
+        
+    Returns:
+        Status dictionary
+    """
+    try:
+        with _get_connection() as conn:
+            conn.executemany(
+                """
+                INSERT INTO scores (task_name, score, calculated_at)
+                VALUES (?, ?, ?)
+                """,
+                scores,
+            )
+    except sqlite3.IntegrityError:
+        return {
+            "status": "error",
+            "message": "Cannot store scores due to a database constraint violation (likely a missing task)",
+        }
+
+    return {"status": "scores saved", "count": len(scores)}
+
+
 def get_tasks_by_status(status: str) -> List[Dict[str, Any]]:
     """
     Get all tasks with a specific status.
@@ -210,17 +393,17 @@ def get_tasks_by_status(status: str) -> List[Dict[str, Any]]:
     Returns:
         List of matching tasks
     """
-    with _get_connection() as conn:
-        cursor = conn.execute(
-            """
-            SELECT task_name, scale_difficulty, priority, createdAt, timedue
-            FROM tasks
-            WHERE priority = ?
-            """,
-            (status,),
-        )
-        rows = cursor.fetchall()
-    return [dict(row) for row in rows]
+    conn = _get_connection()
+    cursor = conn.execute(
+        """
+        SELECT task_name, scale_difficulty, priority, createdAt, timedue
+        FROM tasks
+        WHERE priority = ?
+        """,
+        (status,),
+    )
+    rows = cursor.fetchall()
+    return _rows_to_tasks(rows)
 
 
 def get_overdue_tasks() -> List[Dict[str, Any]]:
@@ -230,31 +413,74 @@ def get_overdue_tasks() -> List[Dict[str, Any]]:
     Returns:
         List of overdue tasks
     """
-    from datetime import datetime, timezone
-
-    with _get_connection() as conn:
-        cursor = conn.execute(
-            """
-            SELECT task_name, scale_difficulty, priority, createdAt, timedue
-            FROM tasks
-            WHERE timedue IS NOT NULL
-              AND priority != ?
-            """,
-            ("Completed",),
-        )
-        tasks = [dict(row) for row in cursor.fetchall()]
-
-    now = datetime.now(timezone.utc)
-    overdue = []
-
-    for task in tasks:
-        try:
-            due_date = datetime.fromisoformat(str(task["timedue"]).replace("Z", "+00:00"))
-            if due_date.tzinfo is None:
-                due_date = due_date.replace(tzinfo=timezone.utc)
-            if due_date < now:
-                overdue.append(task)
-        except (ValueError, AttributeError, TypeError):
-            continue
-
-    return overdue
+    conn = _get_connection()
+    cursor = conn.execute(
+        """
+        SELECT task_name, scale_difficulty, priority, createdAt, timedue
+        FROM tasks
+        WHERE due_epoch < ?
+          AND priority != ?
+        """,
+        (int(time.time()), "Completed"),
+    )
+    rows = cursor.fetchall()
+    return _rows_to_tasks(rows)
+
+
+def get_upcoming_tasks_db(days_ahead: int = 7) -> List[Dict[str, Any]]:
+    """
+    Get tasks due within the specified number of days, soonest first.
+    
+    Args:
+        days_ahead: Number of days to look ahead
+        
+    Returns:
+        List of upcoming tasks
+    """
+    now = int(time.time())
+    conn = _get_connection()
+    cursor = conn.execute(
+        """
+        SELECT task_name, scale_difficulty, priority, createdAt, timedue
+        FROM tasks
+        WHERE due_epoch BETWEEN ? AND ?
+        ORDER BY due_epoch
+        """,
+        (now, now + days_ahead * 24 * 3600),
+    )
+    rows = cursor.fetchall()
+    return _rows_to_tasks(rows)
+
+
+def get_stats() -> Dict[str, Any]:
+    """
+    Compute overall task statistics in a single aggregate query.
+    
+    Returns:
+        Dictionary of task counts, completion rate and average difficulty
+    """
+    conn = _get_connection()
+    row = conn.execute(
+        """
+        SELECT
+            COUNT(*),
+            COALESCE(SUM(priority = 'Pending'), 0),
+            COALESCE(SUM(priority = 'Ongoing'), 0),
+            COALESCE(SUM(priority = 'Completed'), 0),
+            COALESCE(SUM(due_epoch < ? AND priority != 'Completed'), 0),
+            COALESCE(AVG(CAST(scale_difficulty AS INTEGER)), 0)
+        FROM tasks
+        """,
+        (int(time.time()),),
+    ).fetchone()
+
+    total_tasks, pending, ongoing, completed, overdue, avg_difficulty = row
+    return {
+        "total_tasks": total_tasks,
+        "pending": pending,
+        "ongoing": ongoing,
+        "completed": completed,
+        "overdue": overdue,
+        "completion_rate": round(completed / total_tasks * 100, 1) if total_tasks > 0 else 0,
+        "average_difficulty": round(avg_difficulty, 1),
+    }
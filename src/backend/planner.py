@@ -3,9 +3,18 @@ Study Plan Generator - Core Planning Logic
 Implements dynamic scheduling based on difficulty, priority, time, and exam proximity
 """
 
+import math
+from bisect import bisect_left, insort_right
 from datetime import datetime, timezone, timedelta
+from functools import lru_cache
 from typing import Optional, List, Dict, Any
-from enum import Enum
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; scoring falls back to plain NumPy
+    njit = None
 
 # Difficulty weight mapping (1-5 scale) - Constants
 DIFFICULTY_WEIGHT = {
@@ -23,14 +32,89 @@ PRIORITY_WEIGHT = {
     "Completed": 0.0  # Completed tasks don't need scheduling
 }
 
+# Array forms of the weight tables for vectorized scoring. Difficulty index 0 stands
+# for any out-of-range value; priority names are encoded as codes into PRIORITY_LUT,
+# with one extra trailing slot for unknown names. Both fall back to a weight of 1.0.
+DIFFICULTY_LUT = np.array([1.0] + [DIFFICULTY_WEIGHT[d] for d in range(1, 6)])
+PRIORITY_CODES = {name: code for code, name in enumerate(PRIORITY_WEIGHT)}
+PRIORITY_LUT = np.array(list(PRIORITY_WEIGHT.values()) + [1.0])
+_UNKNOWN_PRIORITY_CODE = len(PRIORITY_CODES)
+# Tuple form of DIFFICULTY_LUT for single-task scoring, indexed without hashing
+_DIFFICULTY_WEIGHTS = tuple(DIFFICULTY_LUT.tolist())
+
+# Upper bounds (in days remaining) of each urgency band used by time_weight, and
+# the weight for each band; anything beyond the last bound gets the final weight
+TIME_THRESHOLDS = (0, 1, 3, 7, 14)
+TIME_WEIGHTS = (
+    5.0,  # Overdue - maximum urgency
+    4.5,  # Due within 24 hours
+    3.5,  # Due within 3 days
+    2.5,  # Due within a week
+    1.5,  # Due within 2 weeks
+    1.0   # Due later
+)
+_TIME_THRESHOLDS = np.array(TIME_THRESHOLDS, dtype=np.float64)
+_SECONDS_PER_DAY = 24 * 3600
+_INV_DAY = 1.0 / _SECONDS_PER_DAY
+_TIME_WEIGHTS = np.array(TIME_WEIGHTS)
+
 
-def time_weight(due_date: Optional[datetime]) -> float:
+@lru_cache(maxsize=4096)
+def _parse_due_timestamp(value: str) -> float:
+    """
+    Parse an ISO-8601 due date string into a POSIX timestamp.
+    
+    Naive values are treated as UTC. Results are cached since many tasks
+    share due dates and the same tasks are parsed on every request, and
+    scoring works on plain floats so no datetime is kept per task.
+    
+    Raises:
+        ValueError: If the string is not a valid ISO-8601 timestamp
+    """
+    # fromisoformat accepts a trailing 'Z' on Python 3.11+
+    due_date = datetime.fromisoformat(value)
+    if due_date.tzinfo is None:
+        due_date = due_date.replace(tzinfo=timezone.utc)
+    return due_date.timestamp()
+
+
+def _to_due_timestamp(value: Any) -> float:
+    """Convert a stored due date (ISO string or datetime) into a POSIX timestamp."""
+    # Strings are the common case and hit the parse cache without a str() round trip
+    if isinstance(value, str):
+        return _parse_due_timestamp(value)
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return _parse_due_timestamp(str(value))
+
+
+def _due_timestamp(task: Dict[str, Any]) -> float:
+    """Return the task's due date as a POSIX timestamp, or NaN if it has none."""
+    timedue = task.get("timedue")
+    if not timedue:
+        return np.nan
+    try:
+        return _to_due_timestamp(timedue)
+    except (ValueError, AttributeError):
+        return np.nan
+
+
+def _urgency_weight(days_remaining: float) -> float:
+    """Return the urgency weight for a number of days left (negative when overdue)."""
+    # Urgency increases as deadline approaches; find the first band whose bound is not exceeded
+    return TIME_WEIGHTS[bisect_left(TIME_THRESHOLDS, days_remaining)]
+
+
+def time_weight(due_date: Optional[datetime], now: Optional[datetime] = None) -> float:
     """
     Calculate time-based urgency weight.
     Returns higher weight for tasks that are due sooner.
     
     Args:
         due_date: Optional datetime when task is due
+        now: Reference time for urgency (defaults to the current UTC time)
         
     Returns:
         float: Weight multiplier based on urgency (1.0 to 5.0)
@@ -38,55 +122,44 @@ def time_weight(due_date: Optional[datetime]) -> float:
     if due_date is None:
         return 1.0  # Default weight for tasks without due date
     
-    now = datetime.now(timezone.utc)
+    if now is None:
+        now = datetime.now(timezone.utc)
     
     # If due_date is naive (no timezone), make it timezone-aware
     if due_date.tzinfo is None:
         due_date = due_date.replace(tzinfo=timezone.utc)
     
     time_remaining = due_date - now
-    days_remaining = time_remaining.total_seconds() / (24 * 3600)
-    
-    # Urgency increases as deadline approaches
-    if days_remaining <= 0:
-        return 5.0  # Overdue - maximum urgency
-    elif days_remaining <= 1:
-        return 4.5  # Due within 24 hours
-    elif days_remaining <= 3:
-        return 3.5  # Due within 3 days
-    elif days_remaining <= 7:
-        return 2.5  # Due within a week
-    elif days_remaining <= 14:
-        return 1.5  # Due within 2 weeks
-    else:
-        return 1.0  # Due later
+    days_remaining = time_remaining.total_seconds() * _INV_DAY
+    
+    return _urgency_weight(days_remaining)
 
 
-def calculate_task_score(task: Dict[str, Any]) -> float:
+def calculate_task_score(task: Dict[str, Any], now: Optional[datetime] = None) -> float:
     """
     Calculate priority score for a task based on difficulty, priority, and time.
     
     Args:
         task: Dictionary containing task information
+        now: Reference time for urgency (defaults to the current UTC time)
         
     Returns:
         float: Priority score for the task
     """
+    if now is None:
+        now = datetime.now(timezone.utc)
+    
     difficulty = int(task.get("scale_difficulty", 1))
     priority = task.get("priority", "Pending")
-    
-    # Parse due date
-    due_date = None
-    if task.get("timedue"):
-        try:
-            due_date = datetime.fromisoformat(str(task["timedue"]).replace('Z', '+00:00'))
-        except (ValueError, AttributeError):
-            due_date = None
+    due_ts = _due_timestamp(task)
     
     # Calculate weights
-    diff_weight = DIFFICULTY_WEIGHT.get(difficulty, 1.0)
+    diff_weight = _DIFFICULTY_WEIGHTS[difficulty if 1 <= difficulty <= 5 else 0]
     pri_weight = PRIORITY_WEIGHT.get(priority, 1.0)
-    time_w = time_weight(due_date)
+    if math.isnan(due_ts):
+        time_w = 1.0  # Default weight for tasks without due date
+    else:
+        time_w = _urgency_weight((due_ts - now.timestamp()) * _INV_DAY)
     
     # Combined score
     score = diff_weight * pri_weight * time_w
@@ -94,6 +167,86 @@ def calculate_task_score(task: Dict[str, Any]) -> float:
     return score
 
 
+def _score_kernel(
+    difficulties: np.ndarray,
+    priority_codes: np.ndarray,
+    due_timestamps: np.ndarray,
+    now_ts: float,
+    difficulty_lut: np.ndarray,
+    priority_lut: np.ndarray,
+    thresholds: np.ndarray,
+    weights: np.ndarray
+) -> np.ndarray:
+    """Per-task scoring loop over parallel arrays; only used when compiled by Numba."""
+    count = difficulties.shape[0]
+    scores = np.empty(count, dtype=np.float64)
+    for i in range(count):
+        difficulty = difficulties[i]
+        if difficulty < 1 or difficulty > 5:
+            difficulty = 0
+        
+        if np.isnan(due_timestamps[i]):
+            time_w = weights[weights.shape[0] - 1]
+        else:
+            days_remaining = (due_timestamps[i] - now_ts) * _INV_DAY
+            time_w = weights[np.searchsorted(thresholds, days_remaining)]
+        
+        scores[i] = difficulty_lut[difficulty] * priority_lut[priority_codes[i]] * time_w
+    return scores
+
+
+# Compiled lazily on first use; cache=True keeps the machine code across restarts
+_compiled_score_kernel = njit(cache=True)(_score_kernel) if njit is not None else None
+
+
+def calculate_task_scores(
+    tasks: List[Dict[str, Any]],
+    now: Optional[datetime] = None
+) -> np.ndarray:
+    """
+    Calculate priority scores for many tasks at once.
+    
+    Equivalent to calling calculate_task_score on each task, but the time
+    weighting and the final multiplication run as NumPy array operations.
+    
+    Args:
+        tasks: List of task dictionaries
+        now: Reference time for urgency (defaults to the current UTC time)
+        
+    Returns:
+        np.ndarray: Priority score for each task, in input order
+    """
+    if now is None:
+        now = datetime.now(timezone.utc)
+    count = len(tasks)
+    
+    difficulties = np.fromiter(
+        (int(task.get("scale_difficulty", 1)) for task in tasks),
+        dtype=np.int64, count=count
+    )
+    priority_codes = np.fromiter(
+        (PRIORITY_CODES.get(task.get("priority", "Pending"), _UNKNOWN_PRIORITY_CODE)
+         for task in tasks),
+        dtype=np.intp, count=count
+    )
+    due_timestamps = np.fromiter(
+        (_due_timestamp(task) for task in tasks), dtype=np.float64, count=count
+    )
+    
+    if _compiled_score_kernel is not None:
+        return _compiled_score_kernel(
+            difficulties, priority_codes, due_timestamps, now.timestamp(),
+            DIFFICULTY_LUT, PRIORITY_LUT, _TIME_THRESHOLDS, _TIME_WEIGHTS
+        )
+    
+    # Missing due dates are NaN, which searchsorted places past the last band (weight 1.0)
+    days_remaining = (due_timestamps - now.timestamp()) * _INV_DAY
+    time_weights = _TIME_WEIGHTS[np.searchsorted(_TIME_THRESHOLDS, days_remaining)]
+    
+    difficulty_codes = np.where((difficulties >= 1) & (difficulties <= 5), difficulties, 0)
+    return DIFFICULTY_LUT[difficulty_codes] * PRIORITY_LUT[priority_codes] * time_weights
+
+
 def generate_study_plan(
     tasks: List[Dict[str, Any]], 
     available_hours_per_day: float = 4.0,
@@ -110,67 +263,90 @@ def generate_study_plan(
     Returns:
         Dictionary containing the generated study plan
     """
+    # One reference time for scoring, session dates and the plan timestamp
+    now = datetime.now(timezone.utc)
+    now_iso = now.isoformat()
+    
     # Filter out completed tasks
     active_tasks = [
         task for task in tasks 
         if task.get("priority") != "Completed"
     ]
     
-    # Calculate scores for all active tasks
-    scored_tasks = []
-    for task in active_tasks:
-        score = calculate_task_score(task)
-        task_with_score = task.copy()
-        task_with_score["priority_score"] = score
-        scored_tasks.append(task_with_score)
+    # Nothing to schedule: skip scoring and session layout entirely
+    if not active_tasks:
+        return {
+            "plan_generated_at": now_iso,
+            "available_hours_per_day": available_hours_per_day,
+            "session_duration": study_session_duration,
+            "total_active_tasks": 0,
+            "total_study_hours": 0.0,
+            "estimated_completion_days": 1,
+            "schedule": []
+        }
+    
+    # Calculate scores for all active tasks in one vectorized pass
+    scores = calculate_task_scores(active_tasks, now)
+    score_values = scores.tolist()
     
-    # Sort tasks by priority score (highest first)
-    scored_tasks.sort(key=lambda x: x["priority_score"], reverse=True)
+    # Order tasks by priority score (highest first); stable so ties keep their input order
+    order = np.argsort(-scores, kind="stable").tolist()
     
     # Generate schedule
     schedule = []
-    current_date = datetime.now(timezone.utc)
     sessions_per_day = int(available_hours_per_day / study_session_duration)
     
-    for task in scored_tasks:
-        # Calculate estimated sessions needed based on difficulty
-        difficulty = int(task.get("scale_difficulty", 1))
-        estimated_sessions = difficulty  # Higher difficulty = more sessions needed
-        
-        # Allocate sessions
-        task_sessions = []
-        for session_num in range(estimated_sessions):
-            session_date = current_date + timedelta(
-                days=(len(schedule) + session_num) // sessions_per_day
-            )
-            session_time_slot = (len(schedule) + session_num) % sessions_per_day
-            
-            task_sessions.append({
-                "session_number": session_num + 1,
-                "date": session_date.isoformat(),
-                "time_slot": session_time_slot + 1,
+    # Sessions are laid out back to back across all tasks, so each task's
+    # sessions are a contiguous run of global slot indices
+    # Read in the same form the scorer uses, once per task
+    difficulties = [active_tasks[i].get("scale_difficulty", 1) for i in order]
+    counts = [max(int(d), 0) for d in difficulties]
+    ends = np.cumsum(counts).tolist()
+    total_sessions = ends[-1]
+    if total_sessions and sessions_per_day < 1:
+        raise ValueError("available_hours_per_day must fit at least one study session")
+    day_offsets, time_slots = np.divmod(np.arange(total_sessions), max(sessions_per_day, 1))
+    day_offsets = day_offsets.tolist()
+    time_slots = (time_slots + 1).tolist()
+    # Each distinct day is formatted only once
+    day_dates = [
+        (now + timedelta(days=day_offset)).isoformat()
+        for day_offset in range(day_offsets[-1] + 1 if total_sessions else 0)
+    ]
+    
+    start = 0
+    for i, difficulty, end in zip(order, difficulties, ends):
+        task = active_tasks[i]
+        # Higher difficulty = more sessions needed
+        task_sessions = [
+            {
+                "session_number": session_num,
+                "date": day_dates[day_offsets[slot]],
+                "time_slot": time_slots[slot],
                 "duration_hours": study_session_duration
-            })
+            }
+            for session_num, slot in enumerate(range(start, end), 1)
+        ]
+        start = end
         
         schedule.append({
             "task_name": task.get("task_name"),
-            "priority_score": task["priority_score"],
-            "difficulty": task.get("scale_difficulty"),
+            "priority_score": score_values[i],
+            "difficulty": difficulty,
             "priority_status": task.get("priority"),
             "due_date": task.get("timedue"),
             "sessions": task_sessions
         })
     
     # Calculate plan statistics
-    total_sessions = sum(len(item["sessions"]) for item in schedule)
     total_study_hours = total_sessions * study_session_duration
     estimated_completion_days = (total_sessions / sessions_per_day) if sessions_per_day > 0 else 0
     
     return {
-        "plan_generated_at": datetime.now(timezone.utc).isoformat(),
+        "plan_generated_at": now_iso,
         "available_hours_per_day": available_hours_per_day,
         "session_duration": study_session_duration,
-        "total_active_tasks": len(scored_tasks),
+        "total_active_tasks": len(active_tasks),
         "total_study_hours": total_study_hours,
         "estimated_completion_days": int(estimated_completion_days) + 1,
         "schedule": schedule
@@ -185,6 +361,10 @@ def adjust_plan_for_missed_task(
     Adjust the study plan when a task is missed.
     Increases priority and reschedules.
     
+    The plan's schedule is expected to be ordered by priority score, highest
+    first, as returned by generate_study_plan. If the task is not in the
+    schedule, the plan is returned unchanged.
+    
     Args:
         current_plan: Current study plan
         missed_task_name: Name of the missed task
@@ -192,32 +372,47 @@ def adjust_plan_for_missed_task(
     Returns:
         Updated study plan
     """
+    schedule = current_plan["schedule"]
+    
     # Find the missed task in the schedule
-    for task in current_plan.get("schedule", []):
+    for index, task in enumerate(schedule):
         if task["task_name"] == missed_task_name:
             # Increase priority score for missed task
             task["priority_score"] = task["priority_score"] * 1.5
             task["priority_status"] = "Ongoing"  # Mark as ongoing to give it attention
-    
-    # Re-sort schedule by priority score
-    current_plan["schedule"].sort(key=lambda x: x["priority_score"], reverse=True)
+            
+            # Only this entry's score grew, so move it forward to its new place
+            # (after any equal scores, as a stable re-sort would) instead of re-sorting
+            del schedule[index]
+            insort_right(schedule, task, hi=index, key=lambda entry: -entry["priority_score"])
+            break
+    else:
+        # The task isn't scheduled (e.g. already completed), so the plan needs no changes
+        return current_plan
     
     # Regenerate session timings
     sessions_per_day = int(
         current_plan.get("available_hours_per_day", 4) / 
         current_plan.get("session_duration", 1)
     )
-    current_date = datetime.now(timezone.utc)
+    now = datetime.now(timezone.utc)
+    now_iso = now.isoformat()
     session_counter = 0
+    # Day offset 0 is the current time itself
+    date_cache = {0: now_iso}
     
     for task in current_plan["schedule"]:
         for session in task["sessions"]:
-            session_date = current_date + timedelta(days=session_counter // sessions_per_day)
-            session["date"] = session_date.isoformat()
-            session["time_slot"] = (session_counter % sessions_per_day) + 1
+            day_offset, time_slot = divmod(session_counter, sessions_per_day)
             session_counter += 1
+            session_date = date_cache.get(day_offset)
+            if session_date is None:
+                session_date = (now + timedelta(days=day_offset)).isoformat()
+                date_cache[day_offset] = session_date
+            session["date"] = session_date
+            session["time_slot"] = time_slot + 1
     
-    current_plan["plan_generated_at"] = datetime.now(timezone.utc).isoformat()
+    current_plan["plan_generated_at"] = now_iso
     current_plan["adjustment_reason"] = f"Adjusted for missed task: {missed_task_name}"
     
     return current_plan
@@ -234,20 +429,23 @@ def get_upcoming_tasks(tasks: List[Dict[str, Any]], days_ahead: int = 7) -> List
     Returns:
         List of upcoming tasks
     """
-    now = datetime.now(timezone.utc)
-    cutoff_date = now + timedelta(days=days_ahead)
+    now_ts = datetime.now(timezone.utc).timestamp()
+    cutoff_ts = now_ts + days_ahead * _SECONDS_PER_DAY
     
     upcoming = []
+    # Sort keys are collected alongside the tasks so sorting never goes back to the dicts
+    due_keys = []
     for task in tasks:
-        if task.get("timedue"):
+        timedue = task.get("timedue")
+        if timedue:
             try:
-                due_date = datetime.fromisoformat(str(task["timedue"]).replace('Z', '+00:00'))
-                if due_date.tzinfo is None:
-                    due_date = due_date.replace(tzinfo=timezone.utc)
+                due_ts = _to_due_timestamp(timedue)
                 
-                if now <= due_date <= cutoff_date:
+                if now_ts <= due_ts <= cutoff_ts:
                     upcoming.append(task)
+                    due_keys.append(timedue)
             except (ValueError, AttributeError):
                 continue
     
-    return sorted(upcoming, key=lambda x: x.get("timedue", ""))
+    order = sorted(range(len(upcoming)), key=due_keys.__getitem__)
+    return [upcoming[i] for i in order]